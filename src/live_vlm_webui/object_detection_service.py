@@ -21,82 +21,735 @@ This module requires ultralytics to be installed. On resource-constrained
 devices like Raspberry Pi, this dependency is optional.
 """
 
+import ast
 import asyncio
+import collections
+import concurrent.futures
+import copy
+import functools
 import logging
+import os
+import shutil
+import statistics
+import tempfile
+import threading
 import time
+import weakref
+from contextlib import nullcontext
+import cv2
 import numpy as np
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set, Tuple
+
+from .gpu_monitor import is_pi_mode
+from .shared_frames import SharedFrameRing
 
 logger = logging.getLogger(__name__)
 
-# Try to import YOLO - it's optional
+# Try to import YOLO - it's optional (torch is pulled in by ultralytics)
 try:
+    import torch
+    import torchvision
     from ultralytics import YOLO
     YOLO_AVAILABLE = True
 except ImportError:
+    torch = None
+    torchvision = None
     YOLO = None
     YOLO_AVAILABLE = False
     logger.warning("ultralytics not installed - YOLO object detection unavailable")
     logger.info("Install with: pip install ultralytics")
 
+# ONNX Runtime is optional - only needed for the "onnxruntime" backend
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ort = None
+    ORT_AVAILABLE = False
+
+
+# Input resolution used for TensorRT export and warm-up
+DEFAULT_IMGSZ = 640
+# Warm-up passes needed to get past cuDNN autotuning and CUDA lazy init
+WARMUP_ITERATIONS = 3
+# Micro-batching: coalesce up to MAX_BATCH_SIZE queued frames into one model call,
+# waiting at most MAX_LATENCY_MS after the first frame for the batch to fill
+MAX_BATCH_SIZE = int(os.environ.get("YOLO_MAX_BATCH_SIZE", "8"))
+MAX_LATENCY_MS = float(os.environ.get("YOLO_MAX_LATENCY_MS", "5"))
+# Opt-in INT8 TensorRT engine on CUDA (ultralytics calibrates it during export)
+TENSORRT_INT8 = os.environ.get("YOLO_INT8", "").lower() in ("1", "true", "yes")
+# Compile the raw PyTorch forward with torch.compile on CUDA (PyTorch 2.1+)
+TORCH_COMPILE = os.environ.get("YOLO_TORCH_COMPILE", "true").lower() in ("1", "true", "yes")
+# Inference backend: "ultralytics" (PyTorch/TensorRT engine) or "onnxruntime"
+BACKENDS = ("ultralytics", "onnxruntime")
+# Number of recent inference latencies kept for metrics
+LATENCY_WINDOW = 128
+# Adaptive confidence: once per ADAPTIVE_WINDOW batches, if their p95 latency exceeds the
+# target, raise the confidence threshold (fewer detections to post-process) up to a cap;
+# lower it back toward the configured value once latency drops below 70% of the target
+# (0 disables)
+TARGET_LATENCY_MS = float(os.environ.get("YOLO_TARGET_LATENCY_MS", "0"))
+ADAPTIVE_CONFIDENCE_STEP = 0.02
+ADAPTIVE_CONFIDENCE_MAX = 0.6
+ADAPTIVE_WINDOW = 20
+# Motion gate: frames whose 64x64 thumbnail differs from the last inferred frame by less
+# than this mean absolute pixel difference reuse the previous detections (0 disables)
+MOTION_THRESHOLD = float(os.environ.get("YOLO_MOTION_THRESHOLD", "2.0"))
+MOTION_THUMBNAIL_SIZE = (64, 64)
+# NMS IoU threshold and per-frame detection cap (matching ultralytics defaults)
+NMS_IOU_THRESHOLD = 0.45
+MAX_DETECTIONS = 300
+# Segmentation masks are downsampled to at most this many cells per side before polygonization
+MASK_GRID_SIZE = 160
+
+
+def _cuda_available() -> bool:
+    """Check whether torch can see a CUDA device"""
+    return torch is not None and torch.cuda.is_available()
+
+
+def _model_task(model_path: str) -> str:
+    """Guess the YOLO task from the model file name (e.g. "yolo26n-seg.pt" -> "segment")"""
+    return "segment" if "-seg" in os.path.basename(model_path) else "detect"
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model(model_path: str, device: str, pi_mode: bool = False) -> Tuple[Any, str]:
+    """
+    Load a YOLO model, exporting PyTorch weights to a TensorRT engine on CUDA
+    (or to an NCNN model in Pi mode, which runs on the ARM NEON units)
+
+    Results are cached per (model_path, device, pi_mode) so that repeated service
+    constructions reuse the same engine instead of exporting/loading again.
+
+    Returns:
+        Tuple of (YOLO model, path of the weights actually loaded)
+    """
+    if pi_mode and model_path.endswith(".pt"):
+        ncnn_path = os.path.splitext(model_path)[0] + "_ncnn_model"
+        try:
+            if not os.path.exists(ncnn_path):
+                logger.info(f"Exporting {model_path} to NCNN (one-time)...")
+                ncnn_path = YOLO(model_path).export(format="ncnn", half=True, imgsz=DEFAULT_IMGSZ)
+            return YOLO(ncnn_path, task=_model_task(model_path)), str(ncnn_path)
+        except Exception as e:
+            logger.warning(f"NCNN export failed, falling back to PyTorch weights: {e}")
+
+    if device.startswith("cuda") and model_path.endswith(".pt"):
+        # The batch size is part of the name: an engine built for another batch size (or a
+        # static batch-1 engine from a plain `yolo export`) would reject micro-batches
+        batch = max(1, MAX_BATCH_SIZE)
+        suffix = f"-int8-b{batch}.engine" if TENSORRT_INT8 else f"-b{batch}.engine"
+        engine_path = os.path.splitext(model_path)[0] + suffix
+        try:
+            if not os.path.exists(engine_path):
+                logger.info(f"Exporting {model_path} to TensorRT (one-time, may take minutes)...")
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    # ultralytics always writes <name>.engine (and <name>.onnx) next to the
+                    # weights; export from a temporary copy so files the user already has
+                    # there (e.g. from `yolo export`) are left alone
+                    source = model_path
+                    if os.path.exists(model_path):
+                        source = shutil.copy(model_path, tmp_dir)
+                    # Dynamic batch dimension so micro-batches fit the engine
+                    exported_path = YOLO(source).export(
+                        format="engine",
+                        half=not TENSORRT_INT8,
+                        int8=TENSORRT_INT8,
+                        imgsz=DEFAULT_IMGSZ,
+                        dynamic=batch > 1,
+                        batch=batch,
+                        workspace=4,
+                        device=device,
+                    )
+                    shutil.move(str(exported_path), engine_path)
+            return YOLO(engine_path, task=_model_task(model_path)), str(engine_path)
+        except Exception as e:
+            logger.warning(f"TensorRT export failed, falling back to PyTorch weights: {e}")
+
+    return YOLO(model_path), model_path
+
+
+# Models from _load_model are cached and shared between services, each calling them from
+# its own inference thread; the ultralytics predictor is not thread-safe
+_predict_locks: "weakref.WeakKeyDictionary[Any, threading.Lock]" = weakref.WeakKeyDictionary()
+_predict_locks_guard = threading.Lock()
+
+
+def _predict_lock(model) -> threading.Lock:
+    """Lock serializing predictor calls into one (possibly shared) model"""
+    with _predict_locks_guard:
+        return _predict_locks.setdefault(model, threading.Lock())
+
+
+def _fold_bgr_to_rgb(module) -> bool:
+    """
+    Reverse the input channels of a model's first convolution, in place
+
+    The model then takes BGR frames directly, so no per-batch channel swap is
+    needed. Returns False (model unchanged) if the first conv is not a plain
+    3-channel one.
+    """
+    first = next((m for m in module.modules() if isinstance(m, torch.nn.Conv2d)), None)
+    if first is None or first.in_channels != 3 or first.groups != 1:
+        return False
+    with torch.no_grad():
+        first.weight.copy_(first.weight.flip(1))
+    return True
+
+
+def _supports_fp16() -> bool:
+    """FP16 Tensor Core inference needs a CUDA device of compute capability 7.0+ (Volta/Turing)"""
+    return _cuda_available() and torch.cuda.get_device_capability(0)[0] >= 7
+
+
+def _mask_polygons(raw: np.ndarray, orig_shape: Tuple[int, int]) -> List[Optional[np.ndarray]]:
+    """
+    Extract one outline polygon per binary mask with OpenCV
+
+    Args:
+        raw: (N, H, W) uint8 masks in (downsampled) letterboxed model-input space
+        orig_shape: (height, width) of the original frame
+
+    Returns:
+        Per-mask (K, 2) float32 arrays of [x, y] points in original frame
+        coordinates, or None for empty masks
+    """
+    n, mh, mw = raw.shape
+    h0, w0 = orig_shape
+    # Undo the letterbox: the frame was scaled by `gain` and centered with padding
+    gain = min(mh / h0, mw / w0)
+    pad_x = (mw - w0 * gain) / 2
+    pad_y = (mh - h0 * gain) / 2
+
+    polygons = []
+    for i in range(n):
+        contours, _ = cv2.findContours(raw[i], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            polygons.append(None)
+            continue
+        contour = max(contours, key=cv2.contourArea).reshape(-1, 2).astype(np.float32)
+        contour[:, 0] = (contour[:, 0] - pad_x) / gain
+        contour[:, 1] = (contour[:, 1] - pad_y) / gain
+        polygons.append(contour)
+    return polygons
+
+
+def _letterbox(
+    image: np.ndarray, new_shape: Tuple[int, int]
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize and pad a frame to the model input shape, keeping its aspect ratio
+
+    Uses OpenCV's SIMD resize/border routines and the same gray (114) padding
+    as ultralytics.
+
+    Returns:
+        Tuple of (padded image, scale gain, (left, top) padding in pixels)
+    """
+    h0, w0 = image.shape[:2]
+    new_h, new_w = new_shape
+    gain = min(new_h / h0, new_w / w0)
+    resized_w, resized_h = round(w0 * gain), round(h0 * gain)
+    if (resized_w, resized_h) != (w0, h0):
+        image = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_x = (new_w - resized_w) / 2
+    pad_y = (new_h - resized_h) / 2
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    if top or bottom or left or right:
+        image = cv2.copyMakeBorder(
+            image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114)
+        )
+    return image, gain, (left, top)
+
+
+def _unletterbox_boxes(
+    xyxy: np.ndarray, gain: float, pad: Tuple[int, int], orig_shape: Tuple[int, int]
+) -> np.ndarray:
+    """Map (N, 4) xyxy boxes from letterboxed model-input back to frame coordinates"""
+    pad_x, pad_y = pad
+    h0, w0 = orig_shape
+    xyxy = (xyxy - np.array([pad_x, pad_y, pad_x, pad_y], dtype=xyxy.dtype)) / gain
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w0)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h0)
+    return xyxy
+
+
+def _decode_predictions(
+    pred: np.ndarray, conf: float, num_classes: int, iou: float = NMS_IOU_THRESHOLD
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode raw YOLO output for a single image into boxes, scores and classes
+
+    Handles both export layouts:
+      - End-to-end (NMS-free YOLO26/YOLOv10): (N, 6+) rows of [x1, y1, x2, y2, score, class]
+      - Classic (YOLOv8/YOLO11): (4 + num_classes [+ 32 mask coeffs], N) columns of
+        [cx, cy, w, h, class scores...], which still need NMS
+
+    Returns:
+        Tuple of (xyxy boxes (M, 4), scores (M,), class ids (M,)) in model-input coordinates
+    """
+    if pred.shape[0] not in (4 + num_classes, 4 + num_classes + 32):
+        # End-to-end output, already one row per detection
+        keep = pred[:, 4] >= conf
+        rows = pred[keep]
+        return rows[:, :4], rows[:, 4], rows[:, 5].astype(np.int32)
+
+    pred = pred.T
+    class_scores = pred[:, 4 : 4 + num_classes]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(classes)), classes]
+    keep = scores >= conf
+    cxcywh, scores, classes = pred[keep, :4], scores[keep], classes[keep]
+
+    xyxy = np.empty_like(cxcywh)
+    xyxy[:, :2] = cxcywh[:, :2] - cxcywh[:, 2:] / 2
+    xyxy[:, 2:] = cxcywh[:, :2] + cxcywh[:, 2:] / 2
+    if len(scores) == 0:
+        return xyxy, scores, classes.astype(np.int32)
+
+    # Class-aware NMS in OpenCV's C++ implementation (expects [x, y, w, h] boxes)
+    xywh = np.concatenate([xyxy[:, :2], cxcywh[:, 2:]], axis=1)
+    idx = cv2.dnn.NMSBoxesBatched(
+        xywh.tolist(), scores.tolist(), classes.tolist(), conf, iou
+    )
+    idx = np.asarray(idx, dtype=np.int64).reshape(-1)
+    return xyxy[idx], scores[idx], classes[idx].astype(np.int32)
+
+
+def _decode_predictions_torch(
+    pred: "torch.Tensor", conf: float, num_classes: int, iou: float = NMS_IOU_THRESHOLD
+) -> "torch.Tensor":
+    """
+    Torch counterpart of _decode_predictions that stays on the model's device
+
+    NMS runs in torchvision's C++/CUDA batched_nms kernel, so only the
+    surviving rows ever need to leave the GPU.
+
+    Returns:
+        (M, 6) tensor of [x1, y1, x2, y2, score, class] in model-input coordinates
+    """
+    if pred.shape[0] not in (4 + num_classes, 4 + num_classes + 32):
+        rows = pred[pred[:, 4] >= conf]
+        return rows[:MAX_DETECTIONS, :6]
+
+    pred = pred.T
+    scores, classes = pred[:, 4 : 4 + num_classes].max(dim=1)
+    keep = scores >= conf
+    cxcywh, scores, classes = pred[keep, :4], scores[keep], classes[keep]
+
+    xyxy = torch.cat([cxcywh[:, :2] - cxcywh[:, 2:] / 2, cxcywh[:, :2] + cxcywh[:, 2:] / 2], dim=1)
+    idx = torchvision.ops.batched_nms(xyxy.float(), scores.float(), classes, iou)[:MAX_DETECTIONS]
+    return torch.cat([xyxy[idx], scores[idx, None], classes[idx, None].to(xyxy.dtype)], dim=1)
+
+
+class _OnnxRuntimeModel:
+    """
+    Exported YOLO model run directly through ONNX Runtime
+
+    Prefers the TensorRT and CUDA execution providers when available. On GPU
+    the input is bound once to a preallocated device buffer (IO binding), so
+    each call is a host->device copy plus the session run.
+    """
+
+    def __init__(self, onnx_path: str, device: str):
+        available = ort.get_available_providers()
+        providers = []
+        if device.startswith("cuda"):
+            providers = [
+                (
+                    "TensorrtExecutionProvider",
+                    {
+                        "trt_fp16_enable": True,
+                        "trt_engine_cache_enable": True,
+                        "trt_engine_cache_path": os.path.dirname(os.path.abspath(onnx_path)),
+                    },
+                ),
+                "CUDAExecutionProvider",
+            ]
+        providers = [
+            p for p in providers if (p[0] if isinstance(p, tuple) else p) in available
+        ] + ["CPUExecutionProvider"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # One intra-op thread per core (4 on a Raspberry Pi) for CPU int8/fp32 kernels
+        options.intra_op_num_threads = os.cpu_count() or 4
+
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+        height, width = model_input.shape[2:]
+        self.input_shape = (
+            height if isinstance(height, int) else DEFAULT_IMGSZ,
+            width if isinstance(width, int) else DEFAULT_IMGSZ,
+        )
+        self.output_names = [output.name for output in self.session.get_outputs()]
+
+        # ultralytics stores the class names in the ONNX metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+        # The model is cached and shared between services, each calling it from its own
+        # inference thread; the bound input buffer must not be overwritten mid-run
+        self._lock = threading.Lock()
+        self._io_binding = None
+        if "CUDAExecutionProvider" in self.session.get_providers():
+            self._input = ort.OrtValue.ortvalue_from_shape_and_type(
+                (1, 3) + self.input_shape, self.input_dtype, "cuda", 0
+            )
+            self._io_binding = self.session.io_binding()
+            self._io_binding.bind_ortvalue_input(self.input_name, self._input)
+            self._io_binding.bind_output(self.output_names[0], "cpu")
+
+        logger.info(f"ONNX Runtime providers: {self.session.get_providers()}")
+
+    def __call__(self, blob: np.ndarray) -> np.ndarray:
+        """Run one preprocessed (1, 3, H, W) blob, returning the raw first output"""
+        blob = blob.astype(self.input_dtype, copy=False)
+        if self._io_binding is not None:
+            with self._lock:
+                self._input.update_inplace(blob)
+                self.session.run_with_iobinding(self._io_binding)
+                return self._io_binding.copy_outputs_to_cpu()[0]
+        return self.session.run(self.output_names[:1], {self.input_name: blob})[0]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_onnx_model(model_path: str, device: str) -> Tuple[_OnnxRuntimeModel, str]:
+    """
+    Load an ONNX Runtime session, exporting PyTorch weights to ONNX once if needed
+
+    Returns:
+        Tuple of (ONNX Runtime model, path of the ONNX file)
+    """
+    onnx_path = model_path
+    if not model_path.endswith(".onnx"):
+        onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+        if not os.path.exists(onnx_path):
+            logger.info(f"Exporting {model_path} to ONNX (one-time)...")
+            onnx_path = YOLO(model_path).export(
+                format="onnx",
+                opset=17,
+                imgsz=DEFAULT_IMGSZ,
+                dynamic=False,
+                half=device.startswith("cuda"),
+                simplify=True,
+                device=device,
+            )
+    return _OnnxRuntimeModel(str(onnx_path), device), str(onnx_path)
+
 
 class ObjectDetectionService:
     """Service for detecting objects in frames using YOLO"""
 
-    def __init__(self, model_path: str = "yolo26n-seg.pt", confidence: float = 0.25):
+    def __init__(
+        self,
+        model_path: str = "yolo26n-seg.pt",
+        confidence: float = 0.25,
+        include_masks: bool = False,
+        backend: Optional[str] = None,
+        max_skipped_frames: int = 30,
+    ):
         """
         Initialize YOLO service
 
         Args:
-            model_path: Path to YOLO model (e.g., "yolov8n.pt")
+            model_path: Path to YOLO model (e.g., "yolov8n.pt" or an exported "yolov8n.onnx")
             confidence: Confidence threshold for detection
+            include_masks: Add segmentation outlines ("mask") to detections
+                (segmentation models only; costs extra post-processing per frame)
+            backend: "ultralytics" or "onnxruntime" (default: YOLO_BACKEND env var,
+                or "onnxruntime" for .onnx models, otherwise "ultralytics")
+            max_skipped_frames: Run inference at least once per this many process_frame
+                calls, even when the motion gate sees a static scene
         
         Raises:
-            ImportError: If ultralytics is not installed
+            ImportError: If the libraries for the selected backend are not installed
+            ValueError: If the backend is unknown
         """
-        if not YOLO_AVAILABLE:
+        if backend is None and is_pi_mode():
+            # Prefer a pre-quantized INT8 ONNX model on the Pi's CPU (e.g. yolo26n-seg-int8.onnx)
+            int8_path = os.path.splitext(model_path)[0] + "-int8.onnx"
+            if os.path.exists(int8_path):
+                logger.info(f"Pi mode: using INT8 model {int8_path}")
+                model_path = int8_path
+
+        if backend is None:
+            default = "onnxruntime" if model_path.endswith(".onnx") else "ultralytics"
+            backend = os.environ.get("YOLO_BACKEND", default)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown YOLO backend '{backend}' (expected one of {BACKENDS})")
+
+        if backend == "onnxruntime" and not ORT_AVAILABLE:
+            raise ImportError(
+                "onnxruntime is required for the onnxruntime backend. "
+                "Install with: pip install onnxruntime-gpu (or onnxruntime on CPU)"
+            )
+        # ONNX Runtime can run an already exported .onnx file without ultralytics
+        if not YOLO_AVAILABLE and not (backend == "onnxruntime" and model_path.endswith(".onnx")):
             raise ImportError(
                 "ultralytics is required for object detection. "
                 "Install with: pip install ultralytics"
             )
         
+        self.backend = backend
         self.model_path = model_path
         self.confidence = confidence
+        self.base_confidence = confidence
+        self.target_latency_ms = TARGET_LATENCY_MS
+        self._batches_since_adapt = 0
+        self.include_masks = include_masks
         self.model = None
+        self._torch_model = None
+        self._names: List[str] = []
+        self._stream = None
+        self._pinned = None
+        self._gpu_frames = None
+        self._gpu_input = None
+        self.device = "cpu"
+        self._use_half = False
+        self._bgr_input = False
+        self._warm_shapes = set()
         self.is_initialized = False
         self.current_detections = []
-        self._processing_lock = asyncio.Lock()
+
+        # Motion gate state; inference is forced at least every max_skipped_frames calls
+        self.motion_threshold = MOTION_THRESHOLD
+        self.max_skipped_frames = max(1, max_skipped_frames)
+        # Last inferred thumbnail and skipped frame count, per producer
+        self._prev_small: Dict[str, np.ndarray] = {}
+        self._skipped_frames: Dict[str, int] = {}
+
+        # Producers with a frame waiting in the batch queue or being inferred
+        self._in_flight: Set[str] = set()
+
+        # Shared memory frame rings attached by process_shared_frame, keyed by name
+        self._shared_rings: Dict[str, SharedFrameRing] = {}
+
+        # Single long-lived inference thread; it owns the model and CUDA context
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="yolo"
+        )
+
+        # Micro-batching queue of (image, future), consumed by _batch_worker
+        self.max_batch_size = max(1, MAX_BATCH_SIZE)
+        self.max_latency_ms = MAX_LATENCY_MS
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
         
-        # Metrics tracking
-        self.last_inference_time = 0.0
+        # Metrics tracking (latencies of the most recent batches only)
+        self._latencies_ns = collections.deque(maxlen=LATENCY_WINDOW)
         self.total_inferences = 0
-        self.total_inference_time = 0.0
 
     def initialize(self):
         """Load the YOLO model (can be slow, so call outside main loop)"""
         if self.is_initialized:
             return
-        
-        if not YOLO_AVAILABLE:
-            logger.error("Cannot initialize YOLO - ultralytics not installed")
-            return
-            
+
+        # Load and warm up on the inference thread, so the CUDA context, stream and any
+        # captured graphs belong to the thread that runs every later inference
+        self._executor.submit(self._load_and_warmup).result()
+
+    def _load_and_warmup(self):
+        """Load the model for the selected backend and warm it up (runs on the inference thread)"""
         try:
-            logger.info(f"Loading Ultralytics YOLO26 model: {self.model_path}...")
-            self.model = YOLO(self.model_path)
+            logger.info(f"Loading YOLO26 model: {self.model_path} ({self.backend} backend)...")
+            if self.backend == "onnxruntime":
+                cuda_ep = "CUDAExecutionProvider" in ort.get_available_providers()
+                self.device = "cuda:0" if cuda_ep else "cpu"
+                self.model, self.model_path = _load_onnx_model(self.model_path, self.device)
+                if self.include_masks:
+                    logger.warning("Segmentation masks are not supported by onnxruntime backend")
+            else:
+                # On CUDA, run through a TensorRT engine; keep .pt weights for CPU/Pi
+                self.device = "cuda:0" if _cuda_available() else "cpu"
+                self._use_half = _supports_fp16()
+                if self.device.startswith("cuda"):
+                    # Let cuDNN autotune convolutions for the fixed input shape
+                    torch.backends.cudnn.benchmark = True
+                    torch.set_float32_matmul_precision("high")
+                self.model, self.model_path = _load_model(
+                    self.model_path, self.device, is_pi_mode()
+                )
+                # PyTorch weights (no engine) are called directly, skipping ultralytics'
+                # result shaping; masks still need the full predictor
+                if isinstance(self.model.model, torch.nn.Module) and not self.include_masks:
+                    # The YOLO object is cached and shared between services; fuse/cast/re-layout
+                    # modify modules in place, so they are applied to a private copy
+                    module = copy.deepcopy(self.model.model)
+                    self._torch_model = module.to(self.device).fuse(verbose=False).eval()
+                    self._bgr_input = _fold_bgr_to_rgb(self._torch_model)
+                    if self.device.startswith("cuda"):
+                        self._to_channels_last()
+                        self._allocate_cuda_buffers()
+            self._cache_class_names()
+            if self._torch_model is not None and self.device.startswith("cuda") and TORCH_COMPILE:
+                self._compile_torch_model()
             # YOLO26 is NMS-free and optimized for edge/CPU
-            # Warm up the model
-            self.model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+            # Warm up the model (frame resolution is unknown until the first detect())
+            self._warmup((DEFAULT_IMGSZ, DEFAULT_IMGSZ, 3), WARMUP_ITERATIONS)
             self.is_initialized = True
-            logger.info("YOLO26 model loaded successfully")
+            logger.info(f"YOLO26 model loaded successfully ({self.model_path} on {self.device})")
         except Exception as e:
             logger.error(f"Failed to load YOLO26 model: {e}")
             raise
 
+    def _cache_class_names(self):
+        """Cache class names as a list indexed by class id (avoids model lookups per detection)"""
+        names = self.model.names
+        self._names = list(names.values()) if isinstance(names, dict) else list(names)
+
+    def _compile_torch_model(self):
+        """Compile the raw forward with torch.compile, keeping eager mode if that fails"""
+        version = tuple(int(part) for part in torch.__version__.split("+")[0].split(".")[:2])
+        if version < (2, 1):
+            return
+
+        eager_model = self._torch_model
+        try:
+            logger.info("Compiling YOLO forward with torch.compile (first passes are slow)...")
+            self._torch_model = torch.compile(eager_model, mode="reduce-overhead", fullgraph=False)
+            # Compilation is lazy and per input shape - capture every micro-batch size now,
+            # not on the live inference thread (where it would also skew latency metrics)
+            for batch_size in range(1, self.max_batch_size + 1):
+                self._warmup((DEFAULT_IMGSZ, DEFAULT_IMGSZ, 3), WARMUP_ITERATIONS, batch_size)
+        except Exception as e:
+            logger.warning(f"torch.compile failed, using eager PyTorch: {e}")
+            self._torch_model = eager_model
+
+    def _to_channels_last(self):
+        """Store conv weights NHWC (and FP16 where supported) so cuDNN runs Tensor Core kernels"""
+        model = self._torch_model.to(memory_format=torch.channels_last)
+        self._torch_model = model.half() if self._use_half else model
+
+    def _allocate_cuda_buffers(self):
+        """Preallocate pinned host staging and device input buffers on a private CUDA stream"""
+        nhwc = (self.max_batch_size, DEFAULT_IMGSZ, DEFAULT_IMGSZ, 3)
+        nchw = (self.max_batch_size, 3, DEFAULT_IMGSZ, DEFAULT_IMGSZ)
+        dtype = torch.float16 if self._use_half else torch.float32
+        # Frames stay uint8 HWC until they are on the GPU (1 byte/pixel over PCIe)
+        self._pinned = torch.empty(nhwc, dtype=torch.uint8, pin_memory=True)
+        self._gpu_frames = torch.empty(nhwc, dtype=torch.uint8, device=self.device)
+        self._gpu_input = torch.empty(
+            nchw, dtype=dtype, device=self.device, memory_format=torch.channels_last
+        )
+        self._stream = torch.cuda.Stream(device=self.device)
+
+    def _predict(self, image):
+        """Run the ultralytics predictor on one image or a list of images (FP16 on Tensor Cores)"""
+        with _predict_lock(self.model):
+            return self.model(
+                image,
+                conf=self.confidence,
+                imgsz=DEFAULT_IMGSZ,
+                verbose=False,
+                half=self._use_half,
+                device=self.device,
+            )
+
+    def _timed_infer_batch(
+        self, images: List[np.ndarray]
+    ) -> Tuple[List[List[Dict[str, Any]]], int]:
+        """Run _infer_batch, also returning its duration in ns (measured in the worker thread)"""
+        start_ns = time.monotonic_ns()
+        batch_detections = self._infer_batch(images)
+        return batch_detections, time.monotonic_ns() - start_ns
+
+    def _infer_batch(self, images: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Run inference and post-processing synchronously, returning detections per image"""
+        if self.backend == "onnxruntime":
+            return [self._infer_onnx(image) for image in images]
+        if self._torch_model is not None:
+            return self._infer_torch(images)
+
+        # Letterbox with OpenCV so ultralytics' own LetterBox is a no-op on 640x640 input
+        letterboxed = [_letterbox(image, (DEFAULT_IMGSZ, DEFAULT_IMGSZ)) for image in images]
+        results = self._predict([padded for padded, _, _ in letterboxed])
+        return [
+            self._extract_detections(result, gain, pad, image.shape[:2])
+            for result, image, (_, gain, pad) in zip(results, images, letterboxed)
+        ]
+
+    def _infer_torch(self, images: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Run the raw PyTorch module on a letterboxed batch and decode/NMS on device"""
+        letterboxed = [_letterbox(image, (DEFAULT_IMGSZ, DEFAULT_IMGSZ)) for image in images]
+
+        # On CUDA everything runs on the service's own stream
+        stream_ctx = torch.cuda.stream(self._stream) if self._stream is not None else nullcontext()
+        with stream_ctx, torch.inference_mode():
+            # On CUDA both weights and input are already FP16 channels_last (no autocast casts)
+            batch = self._to_input_tensor([padded for padded, _, _ in letterboxed])
+            out = self._torch_model(batch)
+            pred = out[0] if isinstance(out, (list, tuple)) else out
+
+            num_classes = len(self._names)
+            batch_detections = []
+            for image, (_, gain, pad), image_pred in zip(images, letterboxed, pred):
+                rows = _decode_predictions_torch(image_pred.float(), self.confidence, num_classes)
+                # Only the surviving rows are copied to the host, in one transfer
+                rows = rows.cpu().numpy()
+                xyxy = _unletterbox_boxes(rows[:, :4], gain, pad, image.shape[:2])
+                batch_detections.append(self._build_detections(xyxy, rows[:, 4], rows[:, 5]))
+        return batch_detections
+
+    def _to_input_tensor(self, padded: List[np.ndarray]) -> "torch.Tensor":
+        """Convert letterboxed BGR frames into a normalized RGB NCHW model input batch"""
+        if self._stream is None:
+            # HWC uint8 -> NCHW float in [0, 1] (RGB unless the first conv takes BGR)
+            blob = cv2.dnn.blobFromImages(
+                padded, scalefactor=1 / 255.0, swapRB=not self._bgr_input
+            )
+            return torch.from_numpy(blob).to(self.device)
+
+        # CUDA: stage the raw uint8 BGR HWC frames in pinned memory (plain memcpy), then
+        # async-copy them to the device and convert there (no per-frame allocations)
+        n = len(padded)
+        pinned = self._pinned.numpy()
+        for i, image in enumerate(padded):
+            np.copyto(pinned[i], image)
+        frames = self._gpu_frames[:n]
+        frames.copy_(self._pinned[:n], non_blocking=True)
+
+        # NHWC permuted to NCHW is already channels_last in memory, so the copy_ below
+        # is a single elementwise uint8 -> float kernel into the preallocated buffer.
+        # BGR -> RGB is folded into the first conv's weights at load time; only if that
+        # was not possible does the flip cost an extra temporary and kernel per batch
+        frames = frames.permute(0, 3, 1, 2)
+        batch = self._gpu_input[:n]
+        batch.copy_(frames if self._bgr_input else frames.flip(1))
+        return batch.div_(255.0)
+
+    def _infer_onnx(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        """Letterbox, run and decode a single frame with the ONNX Runtime model"""
+        padded, gain, (pad_x, pad_y) = _letterbox(image, self.model.input_shape)
+        # BGR HWC uint8 -> RGB NCHW float in [0, 1]
+        blob = cv2.dnn.blobFromImage(padded, scalefactor=1 / 255.0, swapRB=True)
+        pred = self.model(blob)[0]
+
+        xyxy, confs, clss = _decode_predictions(pred, self.confidence, len(self._names))
+        xyxy = _unletterbox_boxes(xyxy, gain, (pad_x, pad_y), image.shape[:2])
+        return self._build_detections(xyxy, confs, clss)
+
+    def _warmup(self, shape: Tuple[int, ...], iterations: int = 1, batch_size: int = 1):
+        """Run untimed passes at the given input shape so real frames hit a warm model"""
+        dummy = np.zeros(shape, dtype=np.uint8)
+        for _ in range(iterations):
+            self._infer_batch([dummy] * batch_size)
+            if self.device.startswith("cuda") and torch is not None:
+                torch.cuda.synchronize()
+        self._warm_shapes.add(shape)
+
     async def detect(self, image: np.ndarray) -> List[Dict[str, Any]]:
         """
         Run detection on a single frame
 
+        Frames from concurrent callers are coalesced into one batched model
+        call (see _batch_worker).
+
         Args:
             image: BGR numpy array
 
@@ -107,67 +760,245 @@ class ObjectDetectionService:
             self.initialize()
 
         try:
-            start_time = time.perf_counter()
-            
-            # Run inference in a thread to avoid blocking the event loop
-            results = await asyncio.to_thread(
-                self.model, image, conf=self.confidence, verbose=False
-            )
-            
-            detections = []
-            if results and len(results) > 0:
-                result = results[0]
-                boxes = result.boxes
-                masks = getattr(result, 'masks', None)
-                
-                for i in range(len(boxes)):
-                    box = boxes[i]
-                    # Get box coordinates in [x1, y1, x2, y2] format
-                    coords = box.xyxy[0].tolist()
-                    conf = float(box.conf[0])
-                    cls = int(box.cls[0])
-                    label = self.model.names[cls]
-                    
-                    det = {
-                        "box": [round(c, 1) for c in coords],
-                        "label": label,
-                        "class_id": cls,
-                        "conf": round(conf, 2)
-                    }
-
-                    # Add segmentation mask if available
-                    if masks is not None:
-                        # xy is a list of segments (polygons)
-                        segments = masks.xy[i]
-                        if segments is not None and len(segments) > 0:
-                            det["mask"] = segments.tolist()
-                    
-                    detections.append(det)
-
-            end_time = time.perf_counter()
-            inference_time = end_time - start_time
-            
-            # Update metrics
-            self.last_inference_time = inference_time
-            self.total_inferences += 1
-            self.total_inference_time += inference_time
-            
-            return detections
+            # First frame of a new resolution pays the warm-up, not the metrics
+            if image.shape not in self._warm_shapes:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, self._warmup, image.shape)
+
+            self._ensure_batch_worker()
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((image, future))
+            return await future
 
         except Exception as e:
             logger.error(f"Error in YOLO detection: {e}")
             return []
 
-    async def process_frame(self, image: np.ndarray) -> None:
+    def _ensure_batch_worker(self):
+        """Start the batch consumer task (once per event loop)"""
+        loop = asyncio.get_running_loop()
+        task = self._batch_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._queue = asyncio.Queue(maxsize=self.max_batch_size * 2)
+            self._batch_task = loop.create_task(self._batch_worker())
+
+    async def _batch_worker(self):
+        """
+        Consume queued frames and run them through the model in batches
+
+        Waits up to max_latency_ms after the first frame for more frames to
+        arrive, then runs a single model call on up to max_batch_size frames.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_latency_ms / 1000
+            while len(items) < self.max_batch_size:
+                if not self._queue.empty():
+                    items.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            images = [image for image, _ in items]
+            futures = [future for _, future in items]
+            try:
+                # Run inference on the dedicated thread to avoid blocking the event loop
+                batch_detections, inference_ns = await loop.run_in_executor(
+                    self._executor, self._timed_infer_batch, images
+                )
+
+                # Update metrics (every frame in the batch waited for the whole call)
+                self._latencies_ns.append(inference_ns)
+                self.total_inferences += len(items)
+                self._adapt_confidence()
+            except asyncio.CancelledError:
+                # close() while a batch is in flight: its frames were already dequeued
+                for future in futures:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, detections in zip(futures, batch_detections):
+                if not future.done():
+                    future.set_result(detections)
+
+    def _adapt_confidence(self):
+        """Trade recall for latency: nudge the confidence threshold toward the latency target"""
+        if self.target_latency_ms <= 0:
+            return
+        # Step at most once per window, so each decision only sees batches run at the
+        # current threshold (a single spike otherwise keeps pushing it up for a whole window)
+        self._batches_since_adapt += 1
+        if self._batches_since_adapt < ADAPTIVE_WINDOW:
+            return
+        self._batches_since_adapt = 0
+
+        recent = list(self._latencies_ns)[-ADAPTIVE_WINDOW:]
+        p95_ms = float(np.percentile(recent, 95)) / 1e6
+        step = ADAPTIVE_CONFIDENCE_STEP
+        if p95_ms > self.target_latency_ms:
+            self.confidence = min(ADAPTIVE_CONFIDENCE_MAX, self.confidence + step)
+        elif p95_ms < 0.7 * self.target_latency_ms:
+            self.confidence = max(self.base_confidence, self.confidence - step)
+
+    def _extract_detections(
+        self,
+        result,
+        gain: float = 1.0,
+        pad: Tuple[int, int] = (0, 0),
+        orig_shape: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Convert one ultralytics result into a list of detection dicts
+
+        Args:
+            result: ultralytics Results for one image
+            gain, pad: Letterbox applied before prediction, undone on the outputs
+            orig_shape: (height, width) of the frame before letterboxing
+                (None if the frame was passed to the model as-is)
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+
+        # One device->host transfer per field instead of one per detection
+        xyxy = boxes.xyxy.cpu().numpy()
+        if orig_shape is not None:
+            xyxy = _unletterbox_boxes(xyxy, gain, pad, orig_shape)
+        detections = self._build_detections(xyxy, boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy())
+
+        # Add segmentation masks only when requested (and available)
+        masks = getattr(result, 'masks', None) if self.include_masks else None
+        if masks is not None:
+            data = masks.data
+            if max(data.shape[1:]) > MASK_GRID_SIZE:
+                scale = MASK_GRID_SIZE / max(data.shape[1:])
+                size = (round(data.shape[1] * scale), round(data.shape[2] * scale))
+                data = torch.nn.functional.interpolate(data[None], size=size, mode="nearest")[0]
+            # Single device->host transfer for all masks, outlines traced in C by OpenCV
+            raw = data.to(torch.uint8).cpu().numpy()
+            offset = np.array(pad, dtype=np.float32)
+            for det, polygon in zip(detections, _mask_polygons(raw, result.orig_shape)):
+                if polygon is not None and len(polygon) > 0:
+                    if orig_shape is not None:
+                        polygon = (polygon - offset) / gain
+                    # Kept as an array; the server serializes it without a Python list round-trip
+                    det["mask"] = np.ascontiguousarray(polygon, dtype=np.float32)
+
+        return detections
+
+    def _build_detections(
+        self, xyxy: np.ndarray, confs: np.ndarray, clss: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """
+        Build detection dicts from (N, 4) boxes, (N,) scores and (N,) class ids
+
+        Values are emitted at full precision; display rounding is left to the UI.
+        """
+        clss = clss.astype(np.int32)
+        names = self._names
+
+        return [
+            {
+                "box": xyxy[i].tolist(),
+                "label": names[clss[i]],
+                "class_id": int(clss[i]),
+                "conf": float(confs[i]),
+            }
+            for i in range(len(clss))
+        ]
+
+    async def process_frame(self, image: np.ndarray, producer: str = "default") -> None:
         """
         Process a frame asynchronously. Updates self.current_detections when done.
+
+        Each producer has at most one frame pending: its frames are dropped
+        while an earlier one is still queued or being inferred, so detections
+        never fall behind a backlog (frames from different producers are still
+        batched together). Frames are also dropped when the batch queue is
+        full, or when the scene has not changed enough since the last inferred
+        frame (the previous detections are kept).
+
+        Args:
+            image: BGR frame
+            producer: Identifies the frame source (e.g. one camera stream)
         """
-        if self._processing_lock.locked():
+        if producer in self._in_flight or (self._queue is not None and self._queue.full()):
             return
 
-        async with self._processing_lock:
+        small = cv2.resize(image, MOTION_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        prev_small = self._prev_small.get(producer)
+        skipped = self._skipped_frames.get(producer, 0)
+        if (
+            self.motion_threshold > 0
+            and prev_small is not None
+            and skipped < self.max_skipped_frames
+        ):
+            # Mean absolute difference, summed in one SIMD pass by OpenCV
+            motion = cv2.norm(small, prev_small, cv2.NORM_L1) / small.size
+            if motion < self.motion_threshold:
+                self._skipped_frames[producer] = skipped + 1
+                return
+        self._prev_small[producer] = small
+        self._skipped_frames[producer] = 0
+
+        self._in_flight.add(producer)
+        try:
             detections = await self.detect(image)
-            self.current_detections = detections
+        finally:
+            self._in_flight.discard(producer)
+        self.current_detections = detections
+
+    async def process_shared_frame(self, ring_name: str, index: int) -> None:
+        """
+        Process a frame written by another process into a SharedFrameRing
+
+        The frame is read as a zero-copy view of the shared memory, so no
+        pickling or copying happens between the producer and YOLO. The
+        producer's ring must have enough slots not to overwrite the frame
+        while it is being processed.
+
+        Args:
+            ring_name: Shared memory name of the producer's SharedFrameRing
+            index: Frame index returned by SharedFrameRing.write()
+        """
+        ring = self._shared_rings.get(ring_name)
+        if ring is None:
+            ring = self._shared_rings[ring_name] = SharedFrameRing(name=ring_name)
+        await self.process_frame(ring.frame(index), producer=ring_name)
+
+    async def close(self):
+        """Stop the batch worker and inference thread and detach shared frame rings"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+            self._batch_task = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+            self._queue = None
+
+        # Waits for an in-flight batch, which may still be reading a shared frame
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+        for ring in self._shared_rings.values():
+            ring.close()
+        self._shared_rings.clear()
+        self.is_initialized = False
 
     def get_current_detections(self) -> List[Dict[str, Any]]:
         """Get the most recent detection results"""
@@ -175,11 +1006,11 @@ class ObjectDetectionService:
 
     def get_metrics(self) -> Dict[str, Any]:
         """Get performance metrics"""
-        avg_latency = (
-            self.total_inference_time / self.total_inferences if self.total_inferences > 0 else 0.0
-        )
+        last_ns = self._latencies_ns[-1] if self._latencies_ns else 0
+        median_ns = statistics.median(self._latencies_ns) if self._latencies_ns else 0
         return {
-            "last_latency_ms": self.last_inference_time * 1000,
-            "avg_latency_ms": avg_latency * 1000,
+            "last_latency_ms": last_ns / 1e6,
+            "median_latency_ms": median_ns / 1e6,
+            "confidence": self.confidence,
             "total_detections": self.total_inferences
         }
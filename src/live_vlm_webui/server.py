@@ -34,12 +34,21 @@ from aiortc import (
     RTCIceServer,
 )
 from aiortc.contrib.media import MediaRelay
+import numpy as np
 
 from .vlm_service import VLMService
 from .video_processor import VideoProcessorTrack
 from .gpu_monitor import create_monitor, is_pi_mode, is_raspberry_pi, set_pi_mode, get_pi_model
 from .rtsp_track import RTSPVideoTrack
 
+# orjson serializes NumPy arrays (e.g. mask outlines) in C; fall back to json when absent
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 # Try to import YOLO service - it's optional (especially on Pi)
 try:
     from .object_detection_service import ObjectDetectionService
@@ -416,6 +425,20 @@ async def websocket_handler(request):
     return ws
 
 
+def _json_default(obj):
+    """Serialize NumPy values that the standard json encoder does not understand"""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_message(data: dict) -> str:
+    """Serialize a WebSocket message, passing NumPy arrays through without list conversion"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(data, default=_json_default)
+
+
 def broadcast_text_update(text: str, metrics: dict, detections: list = None):
     """Broadcast text update, metrics, and detections to all connected WebSocket clients"""
     if not websockets:
@@ -429,7 +452,7 @@ def broadcast_text_update(text: str, metrics: dict, detections: list = None):
         if mask_count > 0:
             logger.debug(f"Sending {len(detections)} detections ({mask_count} with masks)")
 
-    message = json.dumps(msg_data)
+    message = dumps_message(msg_data)
 
     # Send to all connected clients
     dead_websockets = set()
@@ -842,6 +865,11 @@ async def on_shutdown(app):
     await asyncio.gather(*coros)
     pcs.clear()
 
+    # Stop the YOLO inference thread
+    if detection_service:
+        await detection_service.close()
+        logger.info("Object detection service closed")
+
     logger.info("Cleanup complete")
 
 
@@ -1033,6 +1061,11 @@ def main():
         action="store_true",
         help="Enable Raspberry Pi mode (CPU-friendly defaults, restricted models)",
     )
+    parser.add_argument(
+        "--no-yolo-masks",
+        action="store_true",
+        help="Don't send YOLO segmentation mask outlines to the UI (skips mask post-processing)",
+    )
 
     args = parser.parse_args()
     
@@ -1119,7 +1152,13 @@ def main():
     detection_service = None
     if YOLO_AVAILABLE and ObjectDetectionService is not None:
         try:
-            detection_service = ObjectDetectionService()
+            # Static scenes still get a fresh detection at least once per VLM interval
+            # (PI_PROCESS_EVERY in Pi mode); the service counts process_frame calls,
+            # which the video track makes every yolo_every_n_frames frames
+            max_skipped = args.process_every // VideoProcessorTrack.yolo_every_n_frames
+            detection_service = ObjectDetectionService(
+                include_masks=not args.no_yolo_masks, max_skipped_frames=max_skipped
+            )
             detection_service.initialize()
             logger.info("YOLO object detection service initialized")
         except Exception as e:
@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Shared Frame Ring
+Passes video frames between processes through shared memory instead of pickling.
+
+A producer process (e.g. a camera reader) writes BGR frames into a ring of
+fixed-size slots; a consumer process attaches to the ring by name and reads
+a frame by its index as a zero-copy NumPy view.
+"""
+
+import logging
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Header layout: [height, width, channels, slots] as int64, padded so frames stay aligned
+_HEADER_FIELDS = 4
+_HEADER_BYTES = 64
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to an existing shared memory block without taking ownership of it
+
+    Before Python 3.13, attaching registers the block with this process's
+    resource tracker, which unlinks it when the process exits - destroying
+    the producer's ring. Only the creating process should be tracked.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # Skip just this registration (unregistering afterwards would also drop the producer's
+    # entry when both ends live in one process, as the tracker keeps a set of names)
+    register = resource_tracker.register
+
+    def register_others(resource_name, rtype):
+        if rtype != "shared_memory" or resource_name.lstrip("/") != name.lstrip("/"):
+            register(resource_name, rtype)
+
+    resource_tracker.register = register_others
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedFrameRing:
+    """Ring buffer of uint8 HWC frames in a named shared memory block"""
+
+    def __init__(
+        self,
+        shape: Optional[Tuple[int, int, int]] = None,
+        slots: int = 4,
+        name: Optional[str] = None,
+    ):
+        """
+        Create a new ring, or attach to an existing one
+
+        Args:
+            shape: Frame shape (height, width, channels). Creates a new ring when given;
+                when None, attaches to the existing ring called `name`
+            slots: Number of frames kept before the oldest slot is overwritten
+            name: Shared memory name (auto-generated when creating)
+        """
+        self.is_owner = shape is not None
+        if self.is_owner:
+            frame_bytes = int(np.prod(shape))
+            self._shm = shared_memory.SharedMemory(
+                name=name, create=True, size=_HEADER_BYTES + frame_bytes * slots
+            )
+            header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+            header[:] = (*shape, slots)
+            del header
+        else:
+            if name is None:
+                raise ValueError("name is required to attach to an existing frame ring")
+            self._shm = _attach(name)
+
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+        height, width, channels, slots = (int(value) for value in header)
+        del header
+        self.shape = (height, width, channels)
+        self.slots = slots
+        self._frames = np.ndarray(
+            (slots,) + self.shape, dtype=np.uint8, buffer=self._shm.buf, offset=_HEADER_BYTES
+        )
+        self._next_index = 0
+
+    @property
+    def name(self) -> str:
+        """Shared memory name to hand to consumer processes"""
+        return self._shm.name
+
+    def write(self, frame: np.ndarray) -> int:
+        """
+        Copy a frame into the next slot
+
+        Returns:
+            Frame index to send to the consumer
+        """
+        index = self._next_index
+        np.copyto(self._frames[index % self.slots], frame)
+        self._next_index += 1
+        return index
+
+    def frame(self, index: int) -> np.ndarray:
+        """
+        Zero-copy view of the frame at `index`
+
+        The view is only valid until the producer wraps around the ring
+        (`slots` writes later); copy it if it must outlive that.
+        """
+        return self._frames[index % self.slots]
+
+    def close(self):
+        """Detach from the shared memory (the owner also frees it)"""
+        # Views into the buffer must be released before the mapping is closed
+        self._frames = None
+        self._shm.close()
+        if self.is_owner:
+            self._shm.unlink()
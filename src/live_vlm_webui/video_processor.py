@@ -51,6 +51,8 @@ class VideoProcessorTrack(VideoStreamTrack):
     # Class variable for frame processing interval (can be updated dynamically)
     # Pi mode uses higher values (60) to reduce CPU load; set via PI_PROCESS_EVERY env var
     process_every_n_frames = int(os.environ.get("PI_PROCESS_EVERY", "30")) if os.environ.get("PI_MODE", "").lower() in ("1", "true", "yes") else 30
+    # YOLO runs on every Nth frame (more often than the VLM, for responsive overlays)
+    yolo_every_n_frames = 2
     # Max allowed latency before dropping frames (in seconds, 0 = disabled)
     max_frame_latency = 0.0
 
@@ -167,9 +169,7 @@ class VideoProcessorTrack(VideoStreamTrack):
                 # Send frame to YOLO for detection (async, non-blocking)
                 if self.detection_service:
                     # We can run YOLO more frequently than VLM if desired
-                    # For now, let's run it on the same interval or every few frames
-                    yolo_interval = 2  # Run YOLO every 2 frames for better responsiveness
-                    if self.frame_count % yolo_interval == 0:
+                    if self.frame_count % self.__class__.yolo_every_n_frames == 0:
                         asyncio.create_task(self.detection_service.process_frame(img))
 
                 # Send frame to VLM for analysis (async, non-blocking)
@@ -1,5 +1,8 @@
 """Integration tests for the web server."""
 
+import json
+
+import numpy as np
 import pytest
 from aiohttp import web
 from aiohttp.test_utils import AioHTTPTestCase
@@ -117,3 +120,25 @@ class TestStaticFiles(AioHTTPTestCase):
         for path in paths_to_check:
             resp = await self.client.request("GET", path)
             assert resp.status != 404, f"Path returns 404 (likely missing files): {path}"
+
+
+class TestMessageSerialization:
+    """Test WebSocket message serialization of detections."""
+
+    @pytest.fixture(params=[True, False], ids=["orjson", "json"])
+    def server(self, request, monkeypatch):
+        from live_vlm_webui import server
+
+        if request.param and not server.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(server, "ORJSON_AVAILABLE", request.param)
+        return server
+
+    def test_numpy_mask_serialized(self, server):
+        """Mask outlines kept as NumPy arrays serialize to nested lists."""
+        mask = np.array([[1.5, 2.0], [3.0, 4.25]], dtype=np.float32)
+        message = server.dumps_message({"detections": [{"label": "cat", "mask": mask}]})
+
+        assert json.loads(message) == {
+            "detections": [{"label": "cat", "mask": [[1.5, 2.0], [3.0, 4.25]]}]
+        }
@@ -0,0 +1,663 @@
+"""Unit tests for ObjectDetectionService using a fake YOLO model (no ultralytics needed)."""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from live_vlm_webui import object_detection_service as ods
+
+
+class FakeTensor:
+    """Minimal stand-in for a torch tensor backed by a NumPy array."""
+
+    def __init__(self, data):
+        self.data = np.asarray(data)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+    def tolist(self):
+        return self.data.tolist()
+
+    def __getitem__(self, item):
+        return FakeTensor(self.data[item])
+
+    def __len__(self):
+        return len(self.data)
+
+    def __float__(self):
+        return float(self.data)
+
+    def __int__(self):
+        return int(self.data)
+
+
+class FakeBoxes:
+    """Minimal stand-in for ultralytics Boxes."""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = FakeTensor(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self.conf = FakeTensor(np.asarray(conf, dtype=np.float32))
+        self.cls = FakeTensor(np.asarray(cls, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.cls)
+
+    def __getitem__(self, i):
+        window = slice(i, i + 1)
+        return FakeBoxes(self.xyxy.data[window], self.conf.data[window], self.cls.data[window])
+
+
+class FakeResult:
+    """Minimal stand-in for an ultralytics Results object (detection only)."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.masks = None
+
+
+class FakeModel:
+    """Callable fake YOLO model that records the batch size of every call."""
+
+    names = {0: "person", 1: "dog"}
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        self.calls.append(len(images))
+        return [self._result(img) for img in images]
+
+    @staticmethod
+    def _result(img):
+        # Class id comes from the center pixel, so tests can tell frames apart
+        h, w = img.shape[:2]
+        class_id = int(img[h // 2, w // 2, 0]) % 2
+        return FakeResult(FakeBoxes([[1.0, 2.0, 30.0, 40.0]], [0.9], [class_id]))
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """ObjectDetectionService wired to a FakeModel."""
+    monkeypatch.setattr(ods, "YOLO_AVAILABLE", True)
+    svc = ods.ObjectDetectionService()
+    svc.model = FakeModel()
+    svc._cache_class_names()
+    svc.is_initialized = True
+    return svc
+
+
+def make_frame(value=0, shape=(48, 64, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+class TestMicroBatching:
+    """Test that concurrent frames are coalesced into batched model calls."""
+
+    async def test_concurrent_frames_share_one_model_call(self, service):
+        """Frames arriving together are run as a single batch."""
+        service.max_latency_ms = 50
+        frame_shape = (48, 64, 3)
+        service._warm_shapes.add(frame_shape)
+
+        frames = [make_frame(v, frame_shape) for v in range(3)]
+        results = await asyncio.gather(*(service.detect(frame) for frame in frames))
+
+        assert service.model.calls == [3]
+        assert [r[0]["label"] for r in results] == ["person", "dog", "person"]
+        assert service.get_metrics()["total_detections"] == 3
+
+    async def test_batch_size_is_capped(self, service):
+        """No model call exceeds max_batch_size frames."""
+        service.max_batch_size = 2
+        service.max_latency_ms = 50
+        service._warm_shapes.add((48, 64, 3))
+
+        await asyncio.gather(*(service.detect(make_frame(v)) for v in range(5)))
+
+        assert max(service.model.calls) <= 2
+        assert sum(service.model.calls) == 5
+
+    async def test_inference_runs_on_dedicated_thread(self, service):
+        """Every model call happens on the single long-lived "yolo" worker thread."""
+        threads = set()
+        model = service.model
+
+        def recording_model(source, **kwargs):
+            threads.add(threading.current_thread().name)
+            return model(source, **kwargs)
+
+        service.model = recording_model
+        await asyncio.gather(*(service.detect(make_frame(v)) for v in range(3)))
+        await service.detect(make_frame(0, (32, 32, 3)))
+
+        assert len(threads) == 1
+        assert threads.pop().startswith("yolo")
+
+    async def test_shared_model_not_called_concurrently(self, service, monkeypatch):
+        """Services sharing one cached model never run it on two threads at once."""
+        active = []
+        overlaps = []
+        model = service.model
+
+        def exclusive_model(source, **kwargs):
+            active.append(1)
+            overlaps.append(len(active) > 1)
+            time.sleep(0.02)
+            active.pop()
+            return model(source, **kwargs)
+
+        other = ods.ObjectDetectionService()
+        for svc in (service, other):
+            svc.model = exclusive_model
+            svc._names = ["person", "dog"]
+            svc.is_initialized = True
+            svc._warm_shapes.add((48, 64, 3))
+
+        await asyncio.gather(
+            *(svc.detect(make_frame(v)) for v in range(2) for svc in (service, other))
+        )
+
+        assert len(overlaps) >= 2
+        assert not any(overlaps)
+
+    async def test_model_error_returns_empty_list(self, service):
+        """A failing model call resolves every waiting frame to no detections."""
+
+        def broken(source, **kwargs):
+            raise RuntimeError("boom")
+
+        service.model = broken
+        service._warm_shapes.add((48, 64, 3))
+
+        assert await service.detect(make_frame()) == []
+
+    async def test_process_frame_updates_current_detections(self, service):
+        """process_frame stores the latest detections."""
+        await service.process_frame(make_frame(1, (640, 640, 3)))
+
+        detections = service.get_current_detections()
+        assert len(detections) == 1
+        assert detections[0]["label"] == "dog"
+        assert detections[0]["box"] == [1.0, 2.0, 30.0, 40.0]
+
+    async def test_slow_inference_does_not_build_a_backlog(self, service):
+        """With inference slower than the frame rate, shown detections stay current."""
+        service.motion_threshold = 0
+        service._warm_shapes.add((640, 640, 3))
+
+        def slow_model(source, **kwargs):
+            time.sleep(0.05 * len(source))
+            # The box's x1 identifies the frame it was predicted on
+            return [
+                FakeResult(FakeBoxes([[float(img[0, 0, 0]), 0.0, 1.0, 1.0]], [0.9], [0]))
+                for img in source
+            ]
+
+        service.model = slow_model
+        lags = []
+        tasks = []
+        for i in range(30):
+            tasks.append(asyncio.create_task(service.process_frame(make_frame(i, (640, 640, 3)))))
+            await asyncio.sleep(1 / 30)
+            if service.get_current_detections():
+                lags.append(i - service.get_current_detections()[0]["box"][0])
+        await asyncio.gather(*tasks)
+
+        assert lags
+        # One 50 ms inference spans ~1.5 frame intervals at 30 fps
+        assert max(lags) <= 4
+
+    async def test_producers_batched_together(self, service):
+        """Frames from different producers are still coalesced into one model call."""
+        service.motion_threshold = 0
+        service.max_latency_ms = 50
+        service._warm_shapes.add((48, 64, 3))
+
+        await asyncio.gather(
+            *(service.process_frame(make_frame(v), producer=f"cam{v}") for v in range(3))
+        )
+
+        assert service.model.calls == [3]
+
+    async def test_boxes_mapped_back_to_frame(self, service):
+        """Boxes predicted on the letterboxed 640x640 input come back in frame coordinates."""
+        # 320x320 frame is upscaled 2x to the 640x640 model input
+        service._warm_shapes.add((320, 320, 3))
+
+        detections = await service.detect(make_frame(0, (320, 320, 3)))
+
+        assert detections[0]["box"] == [0.5, 1.0, 15.0, 20.0]
+
+
+class TestExtractDetections:
+    """Test conversion of model results into detection dicts."""
+
+    def test_extracts_all_boxes(self, service):
+        """Every box becomes a dict with unrounded coordinates and confidence."""
+        boxes = FakeBoxes([[1.04, 2.06, 30.0, 40.0], [5.0, 6.0, 7.0, 8.0]], [0.914, 0.5], [1, 0])
+
+        detections = service._extract_detections(FakeResult(boxes))
+
+        assert [d["label"] for d in detections] == ["dog", "person"]
+        assert [d["class_id"] for d in detections] == [1, 0]
+        assert detections[0]["box"] == pytest.approx([1.04, 2.06, 30.0, 40.0])
+        assert detections[0]["conf"] == pytest.approx(0.914)
+        assert isinstance(detections[0]["class_id"], int)
+        assert isinstance(detections[0]["conf"], float)
+
+    def test_no_boxes(self, service):
+        """A result without boxes yields no detections."""
+        assert service._extract_detections(FakeResult(FakeBoxes([], [], []))) == []
+
+
+class TestMaskPolygons:
+    """Test OpenCV-based mask outline extraction."""
+
+    def test_polygon_mapped_to_original_frame(self):
+        """Outlines are traced on the letterboxed mask and mapped back to frame coordinates."""
+        # 100x200 frame letterboxed into a 100x100 mask: gain 0.5, 25px vertical padding
+        raw = np.zeros((2, 100, 100), dtype=np.uint8)
+        raw[0, 40:60, 20:40] = 1
+
+        polygons = ods._mask_polygons(raw, (100, 200))
+
+        assert polygons[1] is None
+        xs, ys = polygons[0][:, 0], polygons[0][:, 1]
+        assert xs.min() == pytest.approx(40) and xs.max() == pytest.approx(78)
+        assert ys.min() == pytest.approx(30) and ys.max() == pytest.approx(68)
+
+    def test_masks_skipped_by_default(self, service):
+        """Mask polygons are only produced when include_masks is enabled."""
+        result = FakeResult(FakeBoxes([[1.0, 2.0, 3.0, 4.0]], [0.5], [0]))
+        result.masks = object()  # Would fail if touched
+
+        detections = service._extract_detections(result)
+
+        assert "mask" not in detections[0]
+
+
+class TestOnnxPostprocessing:
+    """Test the letterbox and raw-output decoding used by the onnxruntime backend."""
+
+    def test_letterbox_pads_to_model_shape(self):
+        """A 4:3 frame is scaled to fit and padded evenly to the square input."""
+        padded, gain, (pad_x, pad_y) = ods._letterbox(make_frame(0, (480, 640, 3)), (640, 640))
+
+        assert padded.shape == (640, 640, 3)
+        assert gain == pytest.approx(1.0)
+        assert (pad_x, pad_y) == (0, 80)
+        assert padded[0, 0, 0] == 114 and padded[320, 320, 0] == 0
+
+    def test_decode_end_to_end_output(self):
+        """NMS-free (N, 6) output is only filtered by confidence."""
+        pred = np.array([[10, 10, 50, 50, 0.9, 2], [0, 0, 5, 5, 0.1, 1]], dtype=np.float32)
+
+        xyxy, scores, classes = ods._decode_predictions(pred, conf=0.25, num_classes=3)
+
+        assert xyxy.tolist() == [[10, 10, 50, 50]]
+        assert scores.tolist() == pytest.approx([0.9])
+        assert classes.tolist() == [2]
+
+    def test_decode_classic_output_applies_nms(self):
+        """(4 + nc, N) output is converted to xyxy and overlapping boxes are suppressed."""
+        # Columns: two overlapping class-0 boxes, one class-1 box, one low-confidence box
+        pred = np.array(
+            [
+                [30, 31, 30, 90],  # cx
+                [30, 30, 30, 90],  # cy
+                [20, 20, 20, 10],  # w
+                [20, 20, 20, 10],  # h
+                [0.9, 0.8, 0.1, 0.05],  # class 0 score
+                [0.1, 0.1, 0.7, 0.05],  # class 1 score
+            ],
+            dtype=np.float32,
+        )
+
+        xyxy, scores, classes = ods._decode_predictions(pred, conf=0.25, num_classes=2)
+
+        order = np.argsort(classes)
+        assert classes[order].tolist() == [0, 1]
+        assert scores[order].tolist() == pytest.approx([0.9, 0.7])
+        assert xyxy[classes == 0].tolist() == [[20, 20, 40, 40]]
+
+
+class TestTorchPostprocessing:
+    """Test the on-device decode/NMS used for raw PyTorch models."""
+
+    def test_torch_decode_matches_numpy_decode(self):
+        """torchvision NMS keeps the same boxes as the OpenCV implementation."""
+        torch = pytest.importorskip("torch")
+        pytest.importorskip("torchvision")
+        if ods.torch is None:
+            pytest.skip("ultralytics not installed")
+
+        rng = np.random.default_rng(0)
+        pred = np.zeros((4 + 3, 200), dtype=np.float32)
+        pred[:2] = rng.uniform(50, 590, (2, 200))
+        pred[2:4] = rng.uniform(10, 80, (2, 200))
+        pred[4:] = rng.uniform(0, 1, (3, 200))
+
+        xyxy, scores, classes = ods._decode_predictions(pred, conf=0.5, num_classes=3)
+        rows = ods._decode_predictions_torch(torch.from_numpy(pred), 0.5, 3).numpy()
+
+        assert len(rows) == len(scores)
+        assert sorted(rows[:, 4].tolist()) == pytest.approx(sorted(scores.tolist()))
+
+    def test_bgr_folded_into_first_conv(self):
+        """After folding, the model gives the same output for BGR input as before for RGB."""
+        torch = pytest.importorskip("torch")
+        if ods.torch is None:
+            pytest.skip("ultralytics not installed")
+
+        model = torch.nn.Sequential(
+            torch.nn.Conv2d(3, 4, 3), torch.nn.ReLU(), torch.nn.Conv2d(4, 2, 1)
+        )
+        rgb = torch.rand(1, 3, 8, 8)
+        expected = model(rgb)
+
+        assert ods._fold_bgr_to_rgb(model)
+        torch.testing.assert_close(model(rgb.flip(1)), expected)
+
+
+class TestTorchCompile:
+    """Test torch.compile warm-up of the raw PyTorch forward."""
+
+    @pytest.fixture
+    def compiled(self, service, monkeypatch):
+        torch = pytest.importorskip("torch")
+        monkeypatch.setattr(torch, "compile", lambda model, **kwargs: ("compiled", model))
+        service._torch_model = "eager"
+        service.max_batch_size = 4
+        return service
+
+    def test_every_batch_size_warmed_up(self, compiled, monkeypatch):
+        """Each micro-batch size is captured at load time, not on live frames."""
+        sizes = []
+        monkeypatch.setattr(compiled, "_warmup", lambda shape, iterations, n: sizes.append(n))
+
+        compiled._compile_torch_model()
+
+        assert sizes == [1, 2, 3, 4]
+        assert compiled._torch_model == ("compiled", "eager")
+
+    def test_failed_batch_size_falls_back_to_eager(self, compiled, monkeypatch):
+        """A compile failure at any batch size keeps the eager model."""
+
+        def warmup(shape, iterations, n):
+            if n == 3:
+                raise RuntimeError("graph capture failed")
+
+        monkeypatch.setattr(compiled, "_warmup", warmup)
+
+        compiled._compile_torch_model()
+
+        assert compiled._torch_model == "eager"
+
+
+class TestTensorRTEngine:
+    """Test TensorRT engine export and reuse on CUDA."""
+
+    @pytest.fixture
+    def fake_yolo(self, monkeypatch):
+        class FakeYOLO:
+            loaded = []
+            exports = []
+
+            def __init__(self, path, task=None):
+                self.path = path
+                FakeYOLO.loaded.append(path)
+
+            def export(self, **kwargs):
+                FakeYOLO.exports.append(kwargs)
+                exported = self.path.replace(".pt", ".engine")
+                open(exported, "w").close()
+                return exported
+
+        monkeypatch.setattr(ods, "YOLO", FakeYOLO)
+        monkeypatch.setattr(ods, "MAX_BATCH_SIZE", 8)
+        monkeypatch.setattr(ods, "TENSORRT_INT8", False)
+        return FakeYOLO
+
+    def test_engine_named_by_batch_size(self, fake_yolo, tmp_path):
+        """A pre-existing (e.g. static batch-1) engine is neither reused nor overwritten."""
+        (tmp_path / "yolo26n.engine").write_text("user engine")
+        (tmp_path / "yolo26n.pt").touch()
+        weights = str(tmp_path / "yolo26n.pt")
+
+        _, loaded = ods._load_model.__wrapped__(weights, "cuda:0")
+
+        assert loaded == str(tmp_path / "yolo26n-b8.engine")
+        assert (tmp_path / "yolo26n-b8.engine").exists()
+        assert (tmp_path / "yolo26n.engine").read_text() == "user engine"
+        assert fake_yolo.exports[0]["batch"] == 8 and fake_yolo.exports[0]["dynamic"]
+
+    def test_matching_engine_reused(self, fake_yolo, tmp_path):
+        """An engine built for the configured batch size is loaded without exporting."""
+        (tmp_path / "yolo26n-b8.engine").touch()
+
+        _, loaded = ods._load_model.__wrapped__(str(tmp_path / "yolo26n.pt"), "cuda:0")
+
+        assert loaded == str(tmp_path / "yolo26n-b8.engine")
+        assert fake_yolo.exports == []
+
+
+class TestPiInt8Model:
+    """Test that Pi mode picks up a pre-quantized INT8 ONNX model."""
+
+    def test_pi_mode_prefers_int8_onnx(self, monkeypatch, tmp_path):
+        """An existing <name>-int8.onnx switches the service to ONNX Runtime."""
+        monkeypatch.setattr(ods, "ORT_AVAILABLE", True)
+        monkeypatch.setattr(ods, "YOLO_AVAILABLE", False)
+        monkeypatch.setattr(ods, "is_pi_mode", lambda: True)
+        monkeypatch.delenv("YOLO_BACKEND", raising=False)
+        (tmp_path / "yolo26n-seg-int8.onnx").touch()
+
+        svc = ods.ObjectDetectionService(model_path=str(tmp_path / "yolo26n-seg.pt"))
+
+        assert svc.backend == "onnxruntime"
+        assert svc.model_path == str(tmp_path / "yolo26n-seg-int8.onnx")
+
+    def test_without_int8_model_ultralytics_is_required(self, monkeypatch, tmp_path):
+        """Without an INT8 model the .pt weights still need ultralytics."""
+        monkeypatch.setattr(ods, "YOLO_AVAILABLE", False)
+        monkeypatch.setattr(ods, "is_pi_mode", lambda: True)
+        monkeypatch.delenv("YOLO_BACKEND", raising=False)
+
+        with pytest.raises(ImportError):
+            ods.ObjectDetectionService(model_path=str(tmp_path / "yolo26n-seg.pt"))
+
+
+class TestMotionGate:
+    """Test that static scenes skip inference."""
+
+    async def test_static_frames_skip_inference(self, service):
+        """Identical frames reuse the previous detections."""
+        service._warm_shapes.add((48, 64, 3))
+
+        for _ in range(3):
+            await service.process_frame(make_frame(1))
+
+        assert service.model.calls == [1]
+        assert service.get_current_detections()[0]["label"] == "dog"
+
+    async def test_changed_frame_runs_inference(self, service):
+        """A frame that differs enough is sent to the model."""
+        service._warm_shapes.add((48, 64, 3))
+
+        await service.process_frame(make_frame(1))
+        await service.process_frame(make_frame(200))
+
+        assert service.model.calls == [1, 1]
+
+    async def test_motion_tracked_per_producer(self, service):
+        """Two static streams are each compared against their own previous frame."""
+        service._warm_shapes.add((48, 64, 3))
+
+        for _ in range(3):
+            await service.process_frame(make_frame(1), producer="cam1")
+            await service.process_frame(make_frame(200), producer="cam2")
+
+        assert service.model.calls == [1, 1]
+
+    async def test_max_skipped_frames_forces_inference(self, service):
+        """Inference still runs periodically on a static scene."""
+        service._warm_shapes.add((48, 64, 3))
+        service.max_skipped_frames = 2
+
+        for _ in range(4):
+            await service.process_frame(make_frame(1))
+
+        assert service.model.calls == [1, 1]
+
+
+class TestMetrics:
+    """Test the bounded latency metrics."""
+
+    def test_metrics_without_inferences(self, service):
+        """Metrics are zero before any frame is processed."""
+        assert service.get_metrics() == {
+            "last_latency_ms": 0.0,
+            "median_latency_ms": 0.0,
+            "confidence": 0.25,
+            "total_detections": 0,
+        }
+
+    def test_latency_window_is_bounded(self, service):
+        """Only the most recent latencies are kept; median is over that window."""
+        for latency_ms in range(1, ods.LATENCY_WINDOW + 11):
+            service._latencies_ns.append(latency_ms * 1_000_000)
+
+        metrics = service.get_metrics()
+
+        assert len(service._latencies_ns) == ods.LATENCY_WINDOW
+        assert metrics["last_latency_ms"] == ods.LATENCY_WINDOW + 10
+        assert metrics["median_latency_ms"] == pytest.approx(10 + (ods.LATENCY_WINDOW + 1) / 2)
+
+
+class TestSharedFrames:
+    """Test processing frames from a shared memory ring."""
+
+    async def test_process_shared_frame(self, service):
+        """Frames are read from the producer's ring by name and index."""
+        from live_vlm_webui.shared_frames import SharedFrameRing
+
+        ring = SharedFrameRing((48, 64, 3), slots=2)
+        try:
+            index = ring.write(make_frame(1))
+            service._warm_shapes.add((48, 64, 3))
+
+            await service.process_shared_frame(ring.name, index)
+
+            assert service.get_current_detections()[0]["label"] == "dog"
+        finally:
+            await service.close()
+            ring.close()
+
+    async def test_close_during_inference_releases_waiting_frames(self, service):
+        """Frames of a batch still running when close() is called do not hang."""
+        from live_vlm_webui.shared_frames import SharedFrameRing
+
+        model = service.model
+        started = threading.Event()
+
+        def slow_model(source, **kwargs):
+            started.set()
+            time.sleep(0.2)
+            return model(source, **kwargs)
+
+        service.model = slow_model
+        service._warm_shapes.add((48, 64, 3))
+        ring = SharedFrameRing((48, 64, 3), slots=2)
+        try:
+            task = asyncio.create_task(
+                service.process_shared_frame(ring.name, ring.write(make_frame(1)))
+            )
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+
+            await service.close()
+            await asyncio.wait([task], timeout=1)
+
+            assert task.done()
+        finally:
+            ring.close()
+
+    async def test_close_detaches_rings_and_stops_thread(self, service):
+        """close() releases attached rings and shuts down the inference thread."""
+        from live_vlm_webui.shared_frames import SharedFrameRing
+
+        ring = SharedFrameRing((48, 64, 3), slots=2)
+        try:
+            service._warm_shapes.add((48, 64, 3))
+            await service.process_shared_frame(ring.name, ring.write(make_frame(1)))
+
+            await service.close()
+
+            assert service._shared_rings == {}
+            with pytest.raises(RuntimeError):
+                service._executor.submit(lambda: None)
+        finally:
+            ring.close()
+
+
+class TestAdaptiveConfidence:
+    """Test that the confidence threshold follows the latency target."""
+
+    def record(self, service, latency_ms, batches=ods.ADAPTIVE_WINDOW):
+        for _ in range(batches):
+            service._latencies_ns.append(int(latency_ms * 1_000_000))
+            service._adapt_confidence()
+
+    def test_disabled_by_default(self, service):
+        """Without a target latency the threshold never changes."""
+        self.record(service, 500)
+
+        assert service.confidence == 0.25
+
+    def test_raised_under_load_and_capped(self, service):
+        """Slow batches raise the threshold, but not past the cap."""
+        service.target_latency_ms = 50
+
+        # Adaptation starts once a full window of batches has been seen
+        self.record(service, 100)
+        assert service.confidence == pytest.approx(0.27)
+
+        self.record(service, 100, batches=ods.ADAPTIVE_WINDOW * 20)
+        assert service.confidence == pytest.approx(ods.ADAPTIVE_CONFIDENCE_MAX)
+
+    def test_one_step_per_window(self, service):
+        """A full window of slow batches moves the threshold by a single step."""
+        service.target_latency_ms = 50
+
+        self.record(service, 100, batches=ods.ADAPTIVE_WINDOW * 2 - 1)
+
+        assert service.confidence == pytest.approx(0.27)
+
+    def test_transient_spikes_cost_one_step(self, service):
+        """Two outliers among steady fast batches raise the threshold once, briefly."""
+        service.target_latency_ms = 50
+        self.record(service, 30, batches=5)
+        self.record(service, 120, batches=2)
+        self.record(service, 30, batches=ods.ADAPTIVE_WINDOW - 7)
+
+        assert service.confidence == pytest.approx(0.27)
+
+        self.record(service, 30)
+        assert service.confidence == pytest.approx(0.25)
+
+    def test_lowered_back_to_configured_value(self, service):
+        """Fast batches lower the threshold, but never below the configured value."""
+        service.target_latency_ms = 50
+        service.confidence = 0.3
+
+        self.record(service, 10, batches=200)
+
+        assert service.confidence == pytest.approx(0.25)
@@ -0,0 +1,73 @@
+"""Unit tests for passing frames between processes through shared memory."""
+
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from live_vlm_webui.shared_frames import SharedFrameRing
+
+
+@pytest.fixture
+def ring():
+    """Producer-side ring of three 4x6 BGR frames."""
+    ring = SharedFrameRing((4, 6, 3), slots=3)
+    yield ring
+    ring.close()
+
+
+class TestSharedFrameRing:
+    """Test the shared memory frame ring."""
+
+    def test_consumer_sees_producer_frames(self, ring):
+        """A consumer attached by name reads the producer's frame without copying."""
+        frame = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+        index = ring.write(frame)
+
+        consumer = SharedFrameRing(name=ring.name)
+        try:
+            assert consumer.shape == (4, 6, 3)
+            assert consumer.slots == 3
+            view = consumer.frame(index)
+            np.testing.assert_array_equal(view, frame)
+            assert not view.flags.owndata
+            del view
+        finally:
+            consumer.close()
+
+    def test_ring_wraps_around(self, ring):
+        """Indices keep increasing while slots are reused."""
+        indices = [ring.write(np.full((4, 6, 3), i, dtype=np.uint8)) for i in range(4)]
+
+        assert indices == [0, 1, 2, 3]
+        # Index 3 reused slot 0, overwriting frame 0
+        assert ring.frame(3)[0, 0, 0] == 3
+        assert ring.frame(0)[0, 0, 0] == 3
+
+    def test_attach_requires_name(self):
+        """Attaching without a name is rejected."""
+        with pytest.raises(ValueError):
+            SharedFrameRing()
+
+    def test_consumer_process_exit_keeps_ring(self, ring):
+        """A consumer in another process detaches on exit without unlinking the ring."""
+        ring.write(np.full((4, 6, 3), 7, dtype=np.uint8))
+        code = (
+            "import sys\n"
+            "from live_vlm_webui.shared_frames import SharedFrameRing\n"
+            "consumer = SharedFrameRing(name=sys.argv[1])\n"
+            "print(int(consumer.frame(0).sum()))\n"
+            "consumer.close()\n"
+        )
+
+        result = subprocess.run(
+            [sys.executable, "-c", code, ring.name], capture_output=True, text=True, timeout=60
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == str(7 * 4 * 6 * 3)
+        assert "leaked" not in result.stderr
+        # The producer's block survived the consumer process and can still be attached
+        again = SharedFrameRing(name=ring.name)
+        again.close()